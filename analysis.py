@@ -1,3 +1,4 @@
+import html
 import json
 from datetime import datetime
 from collections import Counter
@@ -11,92 +12,10 @@ import matplotlib
 plt.rcParams['font.sans-serif'] = ['Microsoft YaHei', 'SimHei', 'Arial Unicode MS']
 plt.rcParams['axes.unicode_minus'] = False
 
-# 读取 JSON 数据
-with open("chat.json", "r", encoding="utf-8") as f:
-    raw_data = json.load(f)
-    # 兼容 chat.json 结构
-    data = raw_data.get('messages', []) if isinstance(raw_data, dict) else raw_data
-
-# 规范化结构
-messages = []
-for msg in data:
-    # 过滤掉非聊天类型的消息（如系统消息），如果需要的话。
-    # 这里保留所有，后续处理。
-    
-    # 获取时间
-    create_time = msg.get('createTime', 0)
-    if not create_time:
-        continue
-        
-    dt = datetime.fromtimestamp(create_time)
-    
-    msg_dict = {
-        'time': dt,
-        'sender': msg.get('senderDisplayName', '未知'),
-        'content': msg.get('content', ''),
-        'type': msg.get('type', ''),
-        'is_self': msg.get('isSend', 0) == 1
-    }
-    messages.append(msg_dict)
-
-df = pd.DataFrame(messages)
-df = df.sort_values('time') # 确保按时间排序
-
-# 0. 获取史上第一条消息（在过滤之前）
-first_msg_ever = None
-if not df.empty:
-    # 找到第一条非系统消息
-    non_sys_msgs = df[df['type'] != '系统消息']
-    if not non_sys_msgs.empty:
-        first_msg_ever = non_sys_msgs.iloc[0].to_dict()
-    else:
-        first_msg_ever = df.iloc[0].to_dict()
-
-# 1. 筛选时间范围：2025-01-01 到 2025-12-25
-start_date = pd.Timestamp("2025-01-01")
-end_date = pd.Timestamp("2025-12-25 23:59:59")
-df = df[(df['time'] >= start_date) & (df['time'] <= end_date)]
-
-if df.empty:
-    print("指定日期范围内没有聊天记录。")
-    exit()
-
-df['hour'] = df['time'].dt.hour
-df['date'] = df['time'].dt.date
-df['char_count'] = df['content'].apply(len)
-
-# 2. 基础统计
-total_messages = len(df)
-total_chars = df['char_count'].sum()
-
-# 获取发送者名称（容错处理）
-senders = df['sender'].unique()
-self_name = "我"
-friend_name = "朋友"
-for s in senders:
-    if df[df['sender'] == s]['is_self'].iloc[0]:
-        self_name = s
-    else:
-        friend_name = s
+# 默认统计时间范围：2025-01-01 到 2025-12-25
+DEFAULT_START = "2025-01-01"
+DEFAULT_END = "2025-12-25"
 
-msg_count_by_person = df['sender'].value_counts()
-char_count_by_person = df.groupby('sender')['char_count'].sum()
-
-# 3. 消息类型统计
-type_counts = df['type'].value_counts()
-
-# 4. 聊天频率分析（按天）
-daily_counts = df.groupby('date').size()
-# 补全日期范围（可选，为了图表连续性）
-idx = pd.date_range(start_date.date(), end_date.date())
-daily_counts = daily_counts.reindex(idx, fill_value=0)
-
-# 5. 活跃时间段分析（按小时）
-hourly_distribution = df.groupby('hour').size()
-# 补全24小时
-hourly_distribution = hourly_distribution.reindex(range(24), fill_value=0)
-
-# 6. 高频词与话题分析
 # 定义话题关键词字典
 topic_keywords = {
     "🎮 星露谷物语": ["星露谷", "stardew", "Stardew", "鹈鹕镇", "下矿", "种菜", "鱼王", "潘妮", "阿比盖尔", "塞巴斯蒂安", "哈维", "山姆", "亚历克斯", "谢恩", "马鲁", "艾米丽", "海莉", "莱纳斯", "法师", "祝尼魔"],
@@ -106,192 +25,415 @@ topic_keywords = {
     "📚 学习上课": ["学习", "上课", "作业", "考试", "复习", "老师", "绩点", "挂科", "考研", "教室", "图书馆", "自习", "早八", "课设", "实验", "论文", "文献"]
 }
 
-# 统计话题频次
-topic_counts = {k: 0 for k in topic_keywords}
-# 记录每个话题下的具体匹配词，用于后续分析（可选）
-topic_details = {k: Counter() for k in topic_keywords}
-
-for msg in df['content']:
-    if not isinstance(msg, str):
-        continue
-    for topic, keywords in topic_keywords.items():
-        for keyword in keywords:
-            if keyword in msg:
-                topic_counts[topic] += 1
-                topic_details[topic][keyword] += 1
-                # 一条消息若包含多个关键词，算该话题+1即可（或者每出现一次关键词都加，这里采用消息级计数）
-                # 为了避免一条消息多次命中同一话题的不同关键词导致重复计数过多，这里break
-                break
-
 # 定义停用词
 stop_words = set([
     "啊啊", "哈哈", "哈", "啊", "哦", "嗯", "了", "的", "我", "你", "是", "在", "不", "有", "也", "就", "都",
     "吧", "吗", "呢", "去", "要", "这", "那", "个", "很", "好", "么", "怎么", "什么", "因为", "所以",
     "但是", "而且", "然后", "虽然", "其实", "就是", "还是", "或者", "如果", "那个", "这个", "那个",
     "一个", "这么", "我们", "没有", "知道", "时候", "特别", "不是", "这样", "觉得", "感觉", "真的", "现在", "可以", "自己", "可能", "还有", "那些", "这些", "一次", "一下", "一点", "一些",
-    "[动画表情]", "[图片]", "[语音]", "[视频]", "[引用]", "[链接]", "[文件]", "[位置]", "[转账]", 
+    "[动画表情]", "[图片]", "[语音]", "[视频]", "[引用]", "[链接]", "[文件]", "[位置]", "[转账]",
     "拍了拍", "emoji", "表情", "ok", "OK", "Ok", "xxx", "哈哈哈", "啊啊啊", "嘿嘿", "嘻嘻", "呜呜", "emmm",
     "捂脸", "流泪", "抓狂", "憨笑", "拥抱", "呲牙", "偷笑", "调皮", "撇嘴", "发呆"
 ])
 
-text_df = df[df['type'] == '文本消息']
-tokens = []
-all_text = ""
 
-for msg in text_df['content']:
+def load_messages(path="chat.json"):
+    """读取 JSON 数据，返回按时间排序的消息 DataFrame"""
+    with open(path, "r", encoding="utf-8") as f:
+        raw_data = json.load(f)
+        # 兼容 chat.json 结构
+        data = raw_data.get('messages', []) if isinstance(raw_data, dict) else raw_data
+
+    # 规范化结构
+    messages = []
+    for msg in data:
+        # 过滤掉非聊天类型的消息（如系统消息），如果需要的话。
+        # 这里保留所有，后续处理。
+
+        # 获取时间
+        create_time = msg.get('createTime', 0)
+        if not create_time:
+            continue
+
+        dt = datetime.fromtimestamp(create_time)
+
+        # content 可能为 null 或非字符串
+        content = msg.get('content')
+        content = '' if content is None else str(content)
+
+        msg_dict = {
+            'time': dt,
+            'sender': msg.get('senderDisplayName', '未知'),
+            'content': content,
+            'type': msg.get('type', ''),
+            'is_self': msg.get('isSend', 0) == 1
+        }
+        messages.append(msg_dict)
+
+    df = pd.DataFrame(messages, columns=['time', 'sender', 'content', 'type', 'is_self'])
+    df = df.sort_values('time') # 确保按时间排序
+    return df
+
+
+def find_first_message(df):
+    """获取史上第一条消息（在过滤之前）"""
+    first_msg_ever = None
+    if not df.empty:
+        # 找到第一条非系统消息
+        non_sys_msgs = df[df['type'] != '系统消息']
+        if not non_sys_msgs.empty:
+            first_msg_ever = non_sys_msgs.iloc[0].to_dict()
+        else:
+            first_msg_ever = df.iloc[0].to_dict()
+    return first_msg_ever
+
+
+def tokenize(msg):
+    """对一条文本消息分词，过滤停用词、表情占位符和纯数字"""
     if not isinstance(msg, str):
-        continue
-    words = jieba.lcut(msg)
-    for w in words:
-        if len(w) > 1 and w not in stop_words and not w.startswith('[') and not w.isnumeric():
-             tokens.append(w)
+        return []
+    return [w for w in jieba.lcut(msg)
+            if len(w) > 1 and w not in stop_words and not w.startswith('[') and not w.isnumeric()]
 
-word_freq = Counter(tokens).most_common(100)
 
-# 7. 生成图表
+def match_topics(msg):
+    """返回一条消息命中的 (话题, 关键词) 列表，每个话题只取第一个命中的关键词"""
+    if not isinstance(msg, str):
+        return []
+    hits = []
+    for topic, keywords in topic_keywords.items():
+        for keyword in keywords:
+            if keyword in msg:
+                hits.append((topic, keyword))
+                # 一条消息若包含多个关键词，算该话题+1即可（消息级计数）
+                # 为了避免一条消息多次命中同一话题的不同关键词导致重复计数过多，这里break
+                break
+    return hits
 
-# 每日聊天频率趋势图
-plt.figure(figsize=(12, 5))
-plt.plot(daily_counts.index, daily_counts.values, color='#ff9999', linewidth=2)
-plt.title(f"每日聊天频率 ({start_date.date()} - {end_date.date()})")
-plt.xlabel("日期")
-plt.ylabel("消息数")
-plt.grid(True, linestyle='--', alpha=0.6)
-plt.tight_layout()
-plt.savefig("daily_trend.png")
-plt.close()
-
-# 活跃时间段图
-plt.figure(figsize=(10, 5))
-hourly_distribution.plot(kind='bar', color='skyblue', width=0.8)
-plt.title("活跃时间段（按小时）")
-plt.xlabel("小时 (0-23)")
-plt.ylabel("消息数")
-plt.grid(axis='y', linestyle='--', alpha=0.6)
-plt.xticks(rotation=0)
-plt.tight_layout()
-plt.savefig("hourly_activity.png")
-plt.close()
-
-# 词云生成
-if tokens:
-    try:
-        wc = WordCloud(
-            font_path='msyh.ttc', 
-            background_color='white', 
-            width=1000, 
-            height=800,
-            stopwords=stop_words,
-            collocations=False
-        )
-        wc.generate_from_frequencies(dict(word_freq))
-        wc.to_file("wordcloud.png")
-    except Exception as e:
-        print(f"生成词云失败 (可能是字体路径问题): {e}")
-        
-# 话题分布图
-plt.figure(figsize=(10, 6))
-# 过滤掉计数为0的话题（可选）
-filtered_topics = {k: v for k, v in topic_counts.items() if v > 0}
-if filtered_topics:
-    # 排序
+
+def add_time_columns(df):
+    df = df.copy()
+    df['hour'] = df['time'].dt.hour
+    df['date'] = df['time'].dt.date
+    df['char_count'] = df['content'].apply(len)
+    return df
+
+
+def precompute(df):
+    """预先计算每条消息的时间列、分词和话题命中结果，供常驻服务对任意时间窗口复用"""
+    df = add_time_columns(df)
+    # 发送者和消息类型取值很少，转成 category 后按窗口计数快得多；类别按首次出现排序
+    for column in ('sender', 'type'):
+        df[column] = pd.Categorical(df[column], categories=pd.unique(df[column]))
+    df['tokens'] = [tokenize(c) if t == '文本消息' else []
+                    for c, t in zip(df['content'], df['type'])]
+    df['topics'] = [match_topics(c) for c in df['content']]
+    return df
+
+
+def daily_aggregates(df):
+    """按天汇总 precompute 的结果：{date: (词频 Counter, (话题, 关键词) Counter)}
+
+    统计窗口按整天划分时，analyze 只需合并窗口内每天的 Counter，不必再逐条遍历消息。
+    """
+    daily = {}
+    text_mask = df['type'] == '文本消息'
+    for date, tokens, topics, is_text in zip(df['date'], df['tokens'], df['topics'], text_mask):
+        if date not in daily:
+            daily[date] = (Counter(), Counter())
+        token_counter, topic_counter = daily[date]
+        if is_text:
+            token_counter.update(tokens)
+        topic_counter.update(topics)
+    return daily
+
+
+def analyze(df, start_date, end_date, daily=None):
+    """统计 [start_date, end_date] 范围内的聊天数据，范围内没有消息时返回 None
+
+    传入 daily_aggregates 的结果时，词频和话题直接按天合并，要求窗口是整天（end_date 为当天 23:59:59）。
+    """
+    df = df[(df['time'] >= start_date) & (df['time'] <= end_date)]
+
+    if df.empty:
+        return None
+
+    # 常驻服务会提前算好这些列，脚本模式则在这里现算
+    if 'date' not in df.columns:
+        df = add_time_columns(df)
+
+    # 2. 基础统计
+    total_messages = len(df)
+    total_chars = df['char_count'].sum()
+
+    # 获取发送者名称（容错处理）
+    first_is_self = df.groupby('sender', sort=False, observed=True)['is_self'].first()
+    self_name = "我"
+    friend_name = "朋友"
+    for s, is_self in first_is_self.items():
+        if is_self:
+            self_name = s
+        else:
+            friend_name = s
+
+    # sender/type 为 category 时 value_counts 会带上窗口内没出现的类别，去掉计数为 0 的
+    msg_count_by_person = df['sender'].value_counts()
+    msg_count_by_person = msg_count_by_person[msg_count_by_person > 0]
+    char_count_by_person = df.groupby('sender', observed=True)['char_count'].sum()
+
+    # 3. 消息类型统计
+    type_counts = df['type'].value_counts()
+    type_counts = type_counts[type_counts > 0]
+
+    # 4. 聊天频率分析（按天）
+    daily_counts = df.groupby('date').size()
+    # 补全日期范围（可选，为了图表连续性）
+    idx = pd.date_range(start_date.date(), end_date.date())
+    daily_counts = daily_counts.reindex(idx, fill_value=0)
+
+    # 5. 活跃时间段分析（按小时）
+    hourly_distribution = df.groupby('hour').size()
+    # 补全24小时
+    hourly_distribution = hourly_distribution.reindex(range(24), fill_value=0)
+
+    # 6. 高频词与话题分析
+    # 统计话题频次
+    topic_counts = {k: 0 for k in topic_keywords}
+    # 记录每个话题下的具体匹配词，用于后续分析（可选）
+    topic_details = {k: Counter() for k in topic_keywords}
+
+    if daily is not None:
+        # 按日期顺序合并，与逐条统计时 Counter 的插入顺序一致，词频并列时排序不变
+        token_counter = Counter()
+        topic_hits = Counter()
+        for date in pd.date_range(start_date.date(), end_date.date()).date:
+            if date in daily:
+                token_counter.update(daily[date][0])
+                topic_hits.update(daily[date][1])
+        for (topic, keyword), count in topic_hits.items():
+            topic_counts[topic] += count
+            topic_details[topic][keyword] += count
+    else:
+        for msg in df['content']:
+            for topic, keyword in match_topics(msg):
+                topic_counts[topic] += 1
+                topic_details[topic][keyword] += 1
+
+        token_counter = Counter()
+        for msg in df[df['type'] == '文本消息']['content']:
+            token_counter.update(tokenize(msg))
+
+    has_tokens = bool(token_counter)
+    word_freq = token_counter.most_common(100)
+
+    # 过滤掉计数为0的话题，并按热度排序
+    filtered_topics = {k: v for k, v in topic_counts.items() if v > 0}
     sorted_topics = dict(sorted(filtered_topics.items(), key=lambda item: item[1], reverse=True))
-    plt.bar(sorted_topics.keys(), sorted_topics.values(), color=['#FF9999', '#66B2FF', '#99CC99', '#FFCC99', '#CC99FF'])
-    plt.title("话题热度分析")
-    plt.xlabel("话题")
-    plt.ylabel("相关消息数")
+
+    return {
+        'df': df,
+        'start_date': start_date,
+        'end_date': end_date,
+        'total_messages': total_messages,
+        'total_chars': total_chars,
+        'self_name': self_name,
+        'friend_name': friend_name,
+        'msg_count_by_person': msg_count_by_person,
+        'char_count_by_person': char_count_by_person,
+        'type_counts': type_counts,
+        'daily_counts': daily_counts,
+        'hourly_distribution': hourly_distribution,
+        'topic_counts': topic_counts,
+        'topic_details': topic_details,
+        'sorted_topics': sorted_topics,
+        'has_tokens': has_tokens,
+        'word_freq': word_freq,
+    }
+
+
+# 7. 生成图表
+def plot_charts(stats):
+    start_date = stats['start_date']
+    end_date = stats['end_date']
+    daily_counts = stats['daily_counts']
+    sorted_topics = stats['sorted_topics']
+
+    # 每日聊天频率趋势图
+    plt.figure(figsize=(12, 5))
+    plt.plot(daily_counts.index, daily_counts.values, color='#ff9999', linewidth=2)
+    plt.title(f"每日聊天频率 ({start_date.date()} - {end_date.date()})")
+    plt.xlabel("日期")
+    plt.ylabel("消息数")
+    plt.grid(True, linestyle='--', alpha=0.6)
+    plt.tight_layout()
+    plt.savefig("daily_trend.png")
+    plt.close()
+
+    # 活跃时间段图
+    plt.figure(figsize=(10, 5))
+    stats['hourly_distribution'].plot(kind='bar', color='skyblue', width=0.8)
+    plt.title("活跃时间段（按小时）")
+    plt.xlabel("小时 (0-23)")
+    plt.ylabel("消息数")
     plt.grid(axis='y', linestyle='--', alpha=0.6)
-    # 在柱状图上显示数值
-    for i, v in enumerate(sorted_topics.values()):
-        plt.text(i, v + max(sorted_topics.values())*0.01, str(v), ha='center')
+    plt.xticks(rotation=0)
     plt.tight_layout()
-    plt.savefig("topic_distribution.png")
+    plt.savefig("hourly_activity.png")
+    plt.close()
+
+    # 词云生成
+    if stats['has_tokens']:
+        try:
+            wc = WordCloud(
+                font_path='msyh.ttc',
+                background_color='white',
+                width=1000,
+                height=800,
+                stopwords=stop_words,
+                collocations=False
+            )
+            wc.generate_from_frequencies(dict(stats['word_freq']))
+            wc.to_file("wordcloud.png")
+        except Exception as e:
+            print(f"生成词云失败 (可能是字体路径问题): {e}")
+
+    # 话题分布图
+    plt.figure(figsize=(10, 6))
+    if sorted_topics:
+        plt.bar(sorted_topics.keys(), sorted_topics.values(), color=['#FF9999', '#66B2FF', '#99CC99', '#FFCC99', '#CC99FF'])
+        plt.title("话题热度分析")
+        plt.xlabel("话题")
+        plt.ylabel("相关消息数")
+        plt.grid(axis='y', linestyle='--', alpha=0.6)
+        # 在柱状图上显示数值
+        for i, v in enumerate(sorted_topics.values()):
+            plt.text(i, v + max(sorted_topics.values())*0.01, str(v), ha='center')
+        plt.tight_layout()
+        plt.savefig("topic_distribution.png")
     plt.close()
 
+
 # 8. 生成年度报告 Markdown
-report_file = "chat_year_report.md"
-with open(report_file, "w", encoding="utf-8") as f:
-    f.write(f"# � 2025 年度聊天报告\n\n")
-    f.write(f"> 记录时间：{start_date.date()} 至 {end_date.date()}\n\n")
-    
-    f.write("## 📊 基础概览\n")
-    f.write(f"- **总消息数**：{total_messages}\n")
-    f.write(f"- **总字数**：{total_chars}\n")
-    f.write(f"- **日均消息**：{total_messages / len(daily_counts):.1f}\n\n")
-    
-    f.write("## 👥 谁是话痨？\n")
-    f.write("| 昵称 | 消息数 | 字数 |\n")
-    f.write("| --- | --- | --- |\n")
-    for sender in msg_count_by_person.index:
-        count = msg_count_by_person[sender]
-        chars = char_count_by_person.get(sender, 0)
-        f.write(f"| {sender} | {count} | {chars} |\n")
-    f.write("\n")
-    
-    f.write("## 📈 聊天频率分析\n")
-    f.write("### 每日趋势\n")
-    f.write("![每日趋势](daily_trend.png)\n\n")
-    f.write("### 活跃时间段\n")
-    f.write("![活跃时间](hourly_activity.png)\n\n")
-    
-    f.write("## 🗣 高频话题与热词\n")
-    f.write("### 📌 话题热度排行\n")
-    f.write("![话题分布](topic_distribution.png)\n\n")
-    
-    # 输出话题详情
-    for topic, count in sorted_topics.items():
-        if count > 0:
-            f.write(f"#### {topic} (共 {count} 条)\n")
-            # 展示该话题下最高频的3个关键词
-            top_keywords = topic_details[topic].most_common(5)
-            keyword_str = "、".join([f"{k}({v})" for k, v in top_keywords])
-            f.write(f"> 关键词：{keyword_str}\n\n")
-
-    f.write("![词云](wordcloud.png)\n\n")
-    f.write("### 🔥 Top 20 热词\n")
-    for i, (word, freq) in enumerate(word_freq[:20], 1):
-        f.write(f"{i}. **{word}** ({freq})\n")
+def write_markdown_report(stats, report_file="chat_year_report.md"):
+    start_date = stats['start_date']
+    end_date = stats['end_date']
+    total_messages = stats['total_messages']
+    msg_count_by_person = stats['msg_count_by_person']
+    char_count_by_person = stats['char_count_by_person']
+    word_freq = stats['word_freq']
+
+    with open(report_file, "w", encoding="utf-8") as f:
+        f.write(f"# � {start_date.year} 年度聊天报告\n\n")
+        f.write(f"> 记录时间：{start_date.date()} 至 {end_date.date()}\n\n")
+
+        f.write("## 📊 基础概览\n")
+        f.write(f"- **总消息数**：{total_messages}\n")
+        f.write(f"- **总字数**：{stats['total_chars']}\n")
+        f.write(f"- **日均消息**：{total_messages / len(stats['daily_counts']):.1f}\n\n")
+
+        f.write("## 👥 谁是话痨？\n")
+        f.write("| 昵称 | 消息数 | 字数 |\n")
+        f.write("| --- | --- | --- |\n")
+        for sender in msg_count_by_person.index:
+            count = msg_count_by_person[sender]
+            chars = char_count_by_person.get(sender, 0)
+            f.write(f"| {sender} | {count} | {chars} |\n")
+        f.write("\n")
+
+        f.write("## 📈 聊天频率分析\n")
+        f.write("### 每日趋势\n")
+        f.write("![每日趋势](daily_trend.png)\n\n")
+        f.write("### 活跃时间段\n")
+        f.write("![活跃时间](hourly_activity.png)\n\n")
+
+        f.write("## 🗣 高频话题与热词\n")
+        f.write("### 📌 话题热度排行\n")
+        f.write("![话题分布](topic_distribution.png)\n\n")
+
+        # 输出话题详情
+        for topic, count in stats['sorted_topics'].items():
+            if count > 0:
+                f.write(f"#### {topic} (共 {count} 条)\n")
+                # 展示该话题下最高频的3个关键词
+                top_keywords = stats['topic_details'][topic].most_common(5)
+                keyword_str = "、".join([f"{k}({v})" for k, v in top_keywords])
+                f.write(f"> 关键词：{keyword_str}\n\n")
+
+        f.write("![词云](wordcloud.png)\n\n")
+        f.write("### 🔥 Top 20 热词\n")
+        for i, (word, freq) in enumerate(word_freq[:20], 1):
+            f.write(f"{i}. **{word}** ({freq})\n")
+
 
 # 9. 生成 HTML 年度报告
-def generate_html_report():
-    html_file = "year_report.html"
-    
-    # 准备数据
-    # 每日数据: [date_str, count]
-    daily_data = [[d.strftime('%Y-%m-%d'), int(c)] for d, c in daily_counts.items()]
-    
-    # 活跃时段: [hour, count]
-    hourly_data = [int(c) for c in hourly_distribution.values]
-    
-    # 话题数据: [{'name': topic, 'value': count}]
-    topic_data = [{'name': k, 'value': v} for k, v in sorted_topics.items()]
-    
-    # 词云数据: [{'name': word, 'value': freq}]
-    word_cloud_data = [{'name': w, 'value': f} for w, f in word_freq]
-    
+def build_chart_data(stats):
+    """整理 H5 报告里各个图表用到的数据"""
+    msg_count_by_person = stats['msg_count_by_person']
+    char_count_by_person = stats['char_count_by_person']
+
     # 发言对比
     sender_data = []
     for sender in msg_count_by_person.index:
         sender_data.append({
-            'name': sender, 
+            'name': sender,
             'value': int(msg_count_by_person[sender]),
             'chars': int(char_count_by_person.get(sender, 0))
         })
 
-    # 消息类型数据
-    type_data = [{'name': k, 'value': int(v)} for k, v in type_counts.items()]
+    return {
+        # 每日数据: [date_str, count]
+        'daily_data': [[d.strftime('%Y-%m-%d'), int(c)] for d, c in stats['daily_counts'].items()],
+        # 活跃时段: [hour, count]
+        'hourly_data': [int(c) for c in stats['hourly_distribution'].values],
+        # 话题数据: [{'name': topic, 'value': count}]
+        'topic_data': [{'name': k, 'value': v} for k, v in stats['sorted_topics'].items()],
+        # 词云数据: [{'name': word, 'value': freq}]
+        'word_cloud_data': [{'name': w, 'value': f} for w, f in stats['word_freq']],
+        'sender_data': sender_data,
+        # 消息类型数据
+        'type_data': [{'name': k, 'value': int(v)} for k, v in stats['type_counts'].items()],
+    }
+
+
+# 格式化消息内容（处理非文本消息），聊天内容需要转义后再放进 HTML
+def format_content(msg):
+    if not msg: return "无内容"
+    content = msg['content']
+    msg_type = msg['type']
+    if msg_type != '文本消息':
+        return html.escape(f"[{msg_type}]")
+    return html.escape(content)
+
+
+def format_sender(msg):
+    return html.escape(msg['sender']) if msg else ''
+
+
+# 图表数据以 JSON 形式嵌入 <script>，转义 </ 防止聊天内容提前闭合 script 标签
+def to_js(data):
+    return json.dumps(data, ensure_ascii=False).replace('</', '<\\/')
+
+
+def render_html_report(stats, first_msg_ever):
+    """渲染 H5 年度报告，返回 HTML 字符串"""
+    start_date = stats['start_date']
+    end_date = stats['end_date']
+    year = start_date.year
+    total_messages = stats['total_messages']
+    daily_counts = stats['daily_counts']
+
+    # 准备数据
+    chart_data = build_chart_data(stats)
+    daily_data = to_js(chart_data['daily_data'])
+    hourly_data = to_js(chart_data['hourly_data'])
+    topic_data = to_js(chart_data['topic_data'])
+    word_cloud_data = to_js(chart_data['word_cloud_data'])
+    sender_data = to_js(chart_data['sender_data'])
+    type_data = to_js(chart_data['type_data'])
 
     # 第一条消息数据
-    first_msg_2025 = df.iloc[0].to_dict() if not df.empty else None
-    
-    # 格式化消息内容（处理非文本消息）
-    def format_content(msg):
-        if not msg: return "无内容"
-        content = msg['content']
-        msg_type = msg['type']
-        if msg_type != '文本消息':
-            return f"[{msg_type}]"
-        return content
+    df = stats['df']
+    first_msg_in_range = df.iloc[0].to_dict() if not df.empty else None
 
     html_content = f"""
 <!DOCTYPE html>
@@ -299,7 +441,7 @@ def generate_html_report():
 <head>
     <meta charset="UTF-8">
     <meta name="viewport" content="width=device-width, initial-scale=1.0, maximum-scale=1.0, user-scalable=no">
-    <title>2025 年度聊天报告</title>
+    <title>{year} 年度聊天报告</title>
     <!-- Swiper CSS -->
     <link rel="stylesheet" href="https://cdn.jsdelivr.net/npm/swiper@11/swiper-bundle.min.css" />
     <!-- Animate.css -->
@@ -426,7 +568,7 @@ def generate_html_report():
             <!-- Slide 1: Cover -->
             <div class="swiper-slide slide-cover">
                 <div class="animate__animated animate__fadeInDown">
-                    <h1>📅 2025<br>年度聊天报告</h1>
+                    <h1>📅 {year}<br>年度聊天报告</h1>
                     <p>{start_date.date()} ~ {end_date.date()}</p>
                     <div style="margin-top: 40px; font-size: 3em;">🎁</div>
                 </div>
@@ -449,11 +591,11 @@ def generate_html_report():
                 </div>
                 
                 <div class="memory-box animate__animated animate__fadeInUp" style="animation-delay: 0.2s;">
-                    <div>🚀 <strong>2025 第一声问候</strong></div>
-                    <div class="memory-time">{first_msg_2025['time'].strftime('%Y-%m-%d %H:%M:%S') if first_msg_2025 else '无'}</div>
+                    <div>🚀 <strong>{year} 第一声问候</strong></div>
+                    <div class="memory-time">{first_msg_in_range['time'].strftime('%Y-%m-%d %H:%M:%S') if first_msg_in_range else '无'}</div>
                     <div class="memory-content">
-                        <strong>{first_msg_2025['sender'] if first_msg_2025 else ''}:</strong>
-                        {format_content(first_msg_2025)}
+                        <strong>{format_sender(first_msg_in_range)}:</strong>
+                        {format_content(first_msg_in_range)}
                     </div>
                 </div>
                 
@@ -461,7 +603,7 @@ def generate_html_report():
                     <div>�️ <strong>最初的相遇</strong></div>
                     <div class="memory-time">{first_msg_ever['time'].strftime('%Y-%m-%d %H:%M:%S') if first_msg_ever else '无'}</div>
                     <div class="memory-content">
-                         <strong>{first_msg_ever['sender'] if first_msg_ever else ''}:</strong>
+                         <strong>{format_sender(first_msg_ever)}:</strong>
                          {format_content(first_msg_ever)}
                     </div>
                 </div>
@@ -504,7 +646,7 @@ def generate_html_report():
                 <div class="animate__animated animate__zoomIn">
                     <h1 style="font-size: 4em;">❤️</h1>
                     <h2>感谢有你</h2>
-                    <p style="margin-top: 20px;">2026，未完待续...</p>
+                    <p style="margin-top: 20px;">{year + 1}，未完待续...</p>
                 </div>
             </div>
         </div>
@@ -655,10 +797,30 @@ def generate_html_report():
 </body>
 </html>
     """
-    
+    return html_content
+
+
+def generate_html_report(stats, first_msg_ever, html_file="year_report.html"):
+    html_content = render_html_report(stats, first_msg_ever)
     with open(html_file, "w", encoding="utf-8") as f:
         f.write(html_content)
     print(f"H5网页报告已生成：{html_file}")
 
-generate_html_report()
 
+if __name__ == "__main__":
+    df = load_messages("chat.json")
+    # 0. 获取史上第一条消息（在过滤之前）
+    first_msg_ever = find_first_message(df)
+
+    # 1. 筛选时间范围：2025-01-01 到 2025-12-25
+    start_date = pd.Timestamp(DEFAULT_START)
+    end_date = pd.Timestamp(f"{DEFAULT_END} 23:59:59")
+    stats = analyze(df, start_date, end_date)
+
+    if stats is None:
+        print("指定日期范围内没有聊天记录。")
+        exit()
+
+    plot_charts(stats)
+    write_markdown_report(stats)
+    generate_html_report(stats, first_msg_ever)
@@ -0,0 +1,308 @@
+"""常驻分析服务
+
+每次生成报告都跑一遍 `python analysis.py` 需要重新导入 pandas/jieba/matplotlib、
+重新加载 jieba 词典并重新解析 chat.json。这里起一个本地 HTTP 服务，把已加载的聊天记录、
+jieba 词典和统计结果常驻在内存里，按内存预算做 LRU 淘汰。
+
+用法：
+    python server.py --data-dir . --port 8765
+
+接口（chat 为 data-dir 下的 JSON 文件名，默认 chat.json；start/end 为 YYYY-MM-DD，end 含当天）：
+    GET /report?chat=chat.json&start=2025-01-01&end=2025-12-25   -> year_report.html
+    GET /data?chat=chat.json&start=2025-01-01&end=2025-12-25     -> 图表数据 JSON
+    GET /health                                                  -> 缓存状态 JSON
+"""
+import argparse
+import json
+import logging
+import os
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import jieba
+import pandas as pd
+
+import analysis
+
+logger = logging.getLogger(__name__)
+
+
+class InvalidDateError(ValueError):
+    """start/end 参数无法解析"""
+
+
+class ChatLoadError(Exception):
+    """聊天记录文件无法解析"""
+
+
+class LRUCache:
+    """按字节数限制容量的 LRU 缓存，超出预算时淘汰最久未使用的条目"""
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self.current_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            if key not in self._items:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._items.move_to_end(key)
+            return self._items[key][0]
+
+    def peek(self, key):
+        """与 get 相同，但不计入命中统计，也不调整淘汰顺序"""
+        with self._lock:
+            item = self._items.get(key)
+            return item[0] if item is not None else None
+
+    def put(self, key, value, size):
+        with self._lock:
+            if key in self._items:
+                self.current_bytes -= self._items.pop(key)[1]
+            self._items[key] = (value, size)
+            self.current_bytes += size
+            # 单个条目就超出预算时仍保留它（只淘汰其他条目），否则每次请求都要重新计算
+            while self.current_bytes > self.max_bytes and len(self._items) > 1:
+                _, (_, evicted_size) = self._items.popitem(last=False)
+                self.current_bytes -= evicted_size
+
+    def discard(self, key):
+        with self._lock:
+            if key in self._items:
+                self.current_bytes -= self._items.pop(key)[1]
+
+    def stats(self):
+        with self._lock:
+            return {
+                'entries': len(self._items),
+                'bytes': self.current_bytes,
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+            }
+
+
+def _chat_size(df, daily):
+    # 按天汇总的 Counter 没法直接量内存，按每个词条约 100 字节粗略估算
+    size = int(df.memory_usage(deep=True).sum())
+    size += sum(100 * (len(tokens) + len(topics)) for tokens, topics in daily.values())
+    return size
+
+
+def parse_date(value, default):
+    try:
+        date = pd.Timestamp(value or default)
+    except (ValueError, TypeError) as e:
+        raise InvalidDateError(str(e)) from e
+    if date is pd.NaT:
+        raise InvalidDateError(f"无效日期：{value}")
+    # 聊天时间是本地时间（不带时区），带时区的参数只保留其日期部分
+    if date.tzinfo is not None:
+        date = date.tz_localize(None)
+    return date.normalize()
+
+
+class ReportService:
+    """持有聊天记录和统计结果缓存，HTTP 层之外也可以直接调用"""
+
+    def __init__(self, data_dir=".", chat_budget=512 * 1024 * 1024, report_budget=64 * 1024 * 1024):
+        self.data_dir = os.path.realpath(data_dir)
+        self.chats = LRUCache(chat_budget)
+        self.reports = LRUCache(report_budget)
+        # 每个聊天记录一把加载锁，冷加载大文件时不阻塞其他聊天记录；
+        # 值为 (锁, 正在使用的线程数)，没有线程使用时删除
+        self._load_locks = {}
+        self._load_locks_lock = threading.Lock()
+        # 提前加载 jieba 词典，避免第一个请求承担这部分耗时
+        jieba.initialize()
+
+    def resolve_chat(self, chat):
+        path = os.path.realpath(os.path.join(self.data_dir, chat or "chat.json"))
+        if os.path.commonpath([self.data_dir, path]) != self.data_dir or not os.path.isfile(path):
+            raise FileNotFoundError(f"找不到聊天记录：{chat}")
+        return path
+
+    @contextmanager
+    def _load_lock(self, path):
+        with self._load_locks_lock:
+            lock, users = self._load_locks.get(path, (None, 0))
+            lock = lock or threading.Lock()
+            self._load_locks[path] = (lock, users + 1)
+        try:
+            with lock:
+                yield
+        finally:
+            with self._load_locks_lock:
+                users = self._load_locks[path][1] - 1
+                if users:
+                    self._load_locks[path] = (lock, users)
+                else:
+                    del self._load_locks[path]
+
+    def load_chat(self, path):
+        """返回 (mtime, 预处理后的 DataFrame, 史上第一条消息, 按天汇总)，文件修改后自动重新加载"""
+        mtime = os.path.getmtime(path)
+        entry = self.chats.get(path)
+        if entry is not None and entry[0] == mtime:
+            return entry
+        with self._load_lock(path):
+            # 等锁期间可能已被其他线程加载
+            entry = self.chats.peek(path)
+            if entry is not None and entry[0] == mtime:
+                return entry
+            try:
+                df = analysis.load_messages(path)
+                first_msg_ever = analysis.find_first_message(df)
+                df = analysis.precompute(df)
+                daily = analysis.daily_aggregates(df)
+                # 逐条的分词结果已汇总进 daily，不再常驻内存
+                df = df.drop(columns=['tokens', 'topics'])
+            except Exception as e:
+                raise ChatLoadError(f"聊天记录无法解析：{os.path.basename(path)}") from e
+            entry = (mtime, df, first_msg_ever, daily)
+            size = _chat_size(df, daily)
+            if size > self.chats.max_bytes:
+                logger.warning("聊天记录 %s 约 %d MB，超出 --chat-memory-mb 预算，缓存中只会保留它一个",
+                               path, size // (1024 * 1024))
+            self.chats.put(path, entry, size)
+            return entry
+
+    def _get(self, kind, chat, start, end):
+        # 先解析日期，再加载聊天记录，两类错误分开上报
+        start_date = parse_date(start, analysis.DEFAULT_START)
+        end_date = parse_date(end, analysis.DEFAULT_END) + pd.Timedelta(hours=23, minutes=59, seconds=59)
+        if end_date < start_date:
+            raise InvalidDateError("结束日期早于开始日期")
+        path = self.resolve_chat(chat)
+        mtime, df, first_msg_ever, daily = self.load_chat(path)
+
+        # html 和 data 分开缓存，只渲染当前接口需要的那一份
+        key = (kind, path, mtime, start_date, end_date)
+        body = self.reports.get(key)
+        if body is not None:
+            return body
+
+        stats = analysis.analyze(df, start_date, end_date, daily)
+        if stats is None:
+            return None
+        if kind == 'html':
+            body = analysis.render_html_report(stats, first_msg_ever).encode("utf-8")
+        else:
+            data = analysis.build_chart_data(stats)
+            data['summary'] = {
+                'start': str(start_date.date()),
+                'end': str(end_date.date()),
+                'total_messages': int(stats['total_messages']),
+                'total_chars': int(stats['total_chars']),
+                'days': len(stats['daily_counts']),
+            }
+            body = json.dumps(data, ensure_ascii=False).encode("utf-8")
+        self.reports.put(key, body, len(body))
+        return body
+
+    def get_report(self, chat=None, start=None, end=None):
+        """返回 year_report.html 的内容（bytes），时间范围内没有消息时返回 None"""
+        return self._get('html', chat, start, end)
+
+    def get_data(self, chat=None, start=None, end=None):
+        """返回图表数据 JSON（bytes），时间范围内没有消息时返回 None"""
+        return self._get('data', chat, start, end)
+
+    def health(self):
+        return {'chats': self.chats.stats(), 'reports': self.reports.stats()}
+
+
+class ReportHandler(BaseHTTPRequestHandler):
+    service = None
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        params = {k: v[0] for k, v in parse_qs(url.query).items()}
+
+        if url.path == "/health":
+            self._send(200, "application/json", json.dumps(self.service.health()).encode("utf-8"))
+            return
+        if url.path not in ("/report", "/data"):
+            self._send_error(404, "未知接口")
+            return
+
+        if url.path == "/report":
+            get, content_type = self.service.get_report, "text/html; charset=utf-8"
+        else:
+            get, content_type = self.service.get_data, "application/json; charset=utf-8"
+
+        try:
+            body = get(params.get('chat'), params.get('start'), params.get('end'))
+        except InvalidDateError as e:
+            self._send_error(400, f"日期格式错误：{e}")
+            return
+        except FileNotFoundError as e:
+            self._send_error(404, str(e))
+            return
+        except ChatLoadError as e:
+            logger.warning("%s: %s", e, e.__cause__)
+            self._send_error(422, str(e))
+            return
+        except Exception:
+            logger.exception("处理请求失败：%s", self.path)
+            self._send_error(500, "服务器内部错误")
+            return
+
+        if body is None:
+            self._send_error(404, "指定日期范围内没有聊天记录。")
+        else:
+            self._send(200, content_type, body)
+
+    def _send_error(self, status, message):
+        body = json.dumps({'error': message}, ensure_ascii=False).encode("utf-8")
+        self._send(status, "application/json; charset=utf-8", body)
+
+    def _send(self, status, content_type, body):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+def make_server(service, host="127.0.0.1", port=8765):
+    handler = type("BoundReportHandler", (ReportHandler,), {'service': service})
+    return ThreadingHTTPServer((host, port), handler)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="常驻聊天年度报告服务")
+    parser.add_argument("--data-dir", default=".", help="存放聊天记录 JSON 的目录")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--chat-memory-mb", type=int, default=512, help="聊天记录缓存的内存预算")
+    parser.add_argument("--report-memory-mb", type=int, default=64, help="报告结果缓存的内存预算")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+
+    service = ReportService(
+        args.data_dir,
+        chat_budget=args.chat_memory_mb * 1024 * 1024,
+        report_budget=args.report_memory_mb * 1024 * 1024,
+    )
+    server = make_server(service, args.host, args.port)
+    print(f"报告服务已启动：http://{args.host}:{args.port}/report")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,190 @@
+import json
+import os
+import random
+import threading
+import time
+import urllib.error
+import urllib.request
+
+import pytest
+
+import server
+
+
+def write_chat(path, days):
+    """按天生成聊天记录，每天两条：一条文本消息、一条图片消息"""
+    messages = []
+    for i in range(days):
+        t = int(time.mktime((2025, 1, 1 + i, 12, 0, 0, 0, 0, -1)))
+        messages.append({'createTime': t, 'senderDisplayName': '甲', 'content': '今天去图书馆上课',
+                         'type': '文本消息', 'isSend': 1})
+        messages.append({'createTime': t + 60, 'senderDisplayName': '乙', 'content': '[图片]',
+                         'type': '图片消息', 'isSend': 0})
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump({'messages': messages}, f, ensure_ascii=False)
+
+
+@pytest.fixture
+def client(tmp_path):
+    write_chat(tmp_path / 'chat.json', days=10)
+    service = server.ReportService(tmp_path)
+    httpd = server.make_server(service, port=0)
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+
+    def get(path):
+        url = f"http://127.0.0.1:{httpd.server_address[1]}{path}"
+        try:
+            with urllib.request.urlopen(url) as resp:
+                return resp.status, resp.read()
+        except urllib.error.HTTPError as e:
+            return e.code, e.read()
+
+    yield get, tmp_path
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def test_report_and_data(client):
+    get, _ = client
+    status, body = get('/report?start=2025-01-01&end=2025-01-31')
+    assert status == 200
+    assert '2025 年度聊天报告' in body.decode('utf-8')
+
+    status, body = get('/data?start=2025-01-01&end=2025-01-05')
+    assert status == 200
+    data = json.loads(body)
+    assert data['summary']['total_messages'] == 10
+    assert data['summary']['days'] == 5
+    assert data['topic_data'] == [{'name': '📚 学习上课', 'value': 5}]
+
+
+def test_health_reports_cache_hits(client):
+    get, _ = client
+    get('/data')
+    health = json.loads(get('/health')[1])
+    assert health['chats']['misses'] == 1
+    assert health['reports']['misses'] == 1
+
+    get('/data')
+    health = json.loads(get('/health')[1])
+    assert health['chats']['entries'] == 1
+    assert health['chats']['hits'] == 1
+    assert health['reports']['entries'] == 1
+    assert health['reports']['hits'] == 1
+
+
+def test_load_locks_released(tmp_path):
+    write_chat(tmp_path / 'chat.json', days=3)
+    service = server.ReportService(tmp_path)
+    service.get_data()
+    assert service._load_locks == {}
+
+
+def test_error_statuses(client):
+    get, tmp_path = client
+    assert get('/data?start=2030-01-01&end=2030-01-31')[0] == 404
+    assert get('/data?chat=missing.json')[0] == 404
+    assert get('/data?chat=../chat.json')[0] == 404
+    assert get('/nope')[0] == 404
+    assert get('/data?start=not-a-date')[0] == 400
+    assert get('/data?start=2025-05-01&end=2025-04-01')[0] == 400
+
+    (tmp_path / 'broken.json').write_text('not json', encoding='utf-8')
+    status, body = get('/data?chat=broken.json')
+    assert status == 422
+    assert '聊天记录无法解析' in json.loads(body)['error']
+
+    (tmp_path / 'strings.json').write_text('["a", "b"]', encoding='utf-8')
+    assert get('/data?chat=strings.json')[0] == 422
+
+
+def test_non_string_content(client):
+    get, tmp_path = client
+    t = int(time.mktime((2025, 1, 1, 12, 0, 0, 0, 0, -1)))
+    messages = [{'createTime': t, 'senderDisplayName': '甲', 'content': content, 'type': '文本消息', 'isSend': 1}
+                for content in (None, 5, ['a'])]
+    (tmp_path / 'odd.json').write_text(json.dumps(messages), encoding='utf-8')
+    assert get('/data?chat=odd.json')[0] == 200
+
+
+def test_report_escapes_chat_content(client):
+    get, tmp_path = client
+    t = int(time.mktime((2025, 1, 1, 12, 0, 0, 0, 0, -1)))
+    payload = '</script><img src=x onerror=alert(1)>'
+    message = {'createTime': t, 'senderDisplayName': payload, 'content': payload, 'type': '文本消息', 'isSend': 1}
+    (tmp_path / 'xss.json').write_text(json.dumps([message]), encoding='utf-8')
+
+    status, body = get('/report?chat=xss.json')
+    assert status == 200
+    page = body.decode('utf-8')
+    assert payload not in page
+    assert '&lt;/script&gt;&lt;img src=x onerror=alert(1)&gt;' in page
+    assert '"name": "<\\/script><img src=x onerror=alert(1)>"' in page
+
+
+def test_timezone_aware_date(client):
+    get, _ = client
+    status, body = get('/data?start=2025-01-01T00:00%2B08:00&end=2025-01-02')
+    assert status == 200
+    assert json.loads(body)['summary']['total_messages'] == 4
+
+
+def test_reload_on_mtime_change(client):
+    get, tmp_path = client
+    path = tmp_path / 'chat.json'
+    assert json.loads(get('/data')[1])['summary']['total_messages'] == 20
+
+    write_chat(path, days=3)
+    mtime = os.path.getmtime(path) + 10
+    os.utime(path, (mtime, mtime))
+    assert json.loads(get('/data')[1])['summary']['total_messages'] == 6
+
+
+def test_lru_cache_evicts_over_budget():
+    cache = server.LRUCache(10)
+    cache.put('a', 1, 4)
+    cache.put('b', 2, 4)
+    cache.get('a')
+    cache.put('c', 3, 4)
+    assert cache.get('b') is None
+    assert cache.get('a') == 1
+    assert cache.get('c') == 3
+    assert cache.stats()['bytes'] == 8
+
+
+def test_lru_cache_keeps_oversize_entry():
+    cache = server.LRUCache(10)
+    cache.put('a', 1, 4)
+    cache.put('big', 2, 20)
+    assert cache.get('a') is None
+    assert cache.get('big') == 2
+
+
+def test_unexpected_error_returns_500(client, monkeypatch):
+    get, _ = client
+
+    def boom(*args):
+        raise RuntimeError("boom")
+
+    monkeypatch.setattr(server.analysis, 'analyze', boom)
+    assert get('/data')[0] == 500
+
+
+def test_warm_window_on_large_chat(tmp_path):
+    random.seed(0)
+    words = ['图书馆', '上课', '星露谷', '种菜', '代码', '部署', '罗小黑', '暖暖', '晚上', '吃饭', '电影', '周末']
+    start = time.mktime((2025, 1, 1, 0, 0, 0, 0, 0, -1))
+    messages = [{'createTime': int(start + random.random() * 360 * 86400),
+                 'senderDisplayName': random.choice('甲乙'),
+                 'content': ''.join(random.choices(words, k=4)),
+                 'type': random.choice(['文本消息', '文本消息', '图片消息']),
+                 'isSend': random.randint(0, 1)}
+                for _ in range(50000)]
+    (tmp_path / 'chat.json').write_text(json.dumps(messages, ensure_ascii=False), encoding='utf-8')
+
+    service = server.ReportService(tmp_path)
+    service.get_data(start='2025-01-01', end='2025-01-31')
+    for start_date, end_date in [('2025-01-01', '2025-12-31'), ('2025-02-01', '2025-09-30')]:
+        t = time.perf_counter()
+        assert service.get_report(start=start_date, end=end_date) is not None
+        assert time.perf_counter() - t < 1